@@ -2,11 +2,11 @@
 
 from typing import (
     Optional,
-    Dict
+    Dict,
+    Iterator,
+    Mapping
 )
-from dotenv import load_dotenv; load_dotenv()
 import random
-import ipaddress
 import os
 
 # --- API Configuration ---
@@ -14,13 +14,50 @@ import os
 
 DATASET_FILES_DIR = "./dataset_files" # important
 
-API_KEYS: Dict[str, Optional[str]] = {
-    "NVIDIA": os.environ.get("NVIDIA_API_KEY"),
-    "CEREBRAS": os.environ.get("CEREBRAS_API_KEY"),
-    "DEEPINFRA": os.environ.get("DEEPINFRA_API_KEY"),
-    "SAMBANOVA": os.environ.get("SAMBANOVA_API_KEY"),
+API_KEY_ENV_VARS: Dict[str, str] = {
+    "NVIDIA": "NVIDIA_API_KEY",
+    "CEREBRAS": "CEREBRAS_API_KEY",
+    "DEEPINFRA": "DEEPINFRA_API_KEY",
+    "SAMBANOVA": "SAMBANOVA_API_KEY",
 }
 
+_ENV_LOADED = False
+
+def load_env() -> None:
+    """
+    Loads the .env file into the environment, once.
+    Deferred until a key is actually needed so `--help` and dry runs start fast.
+    """
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _ENV_LOADED = True
+
+class _ApiKeys(Mapping):
+    """
+    Read-only view of the provider API keys, resolved on first access.
+    """
+    def __init__(self) -> None:
+        self._keys: Optional[Dict[str, Optional[str]]] = None
+
+    def _load(self) -> Dict[str, Optional[str]]:
+        if self._keys is None:
+            load_env()
+            self._keys = {name: os.environ.get(var) for name, var in API_KEY_ENV_VARS.items()}
+        return self._keys
+
+    def __getitem__(self, name: str) -> Optional[str]:
+        return self._load()[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+API_KEYS: Mapping[str, Optional[str]] = _ApiKeys()
+
 """
 Contains all the configs for the data generator
 """
@@ -97,6 +134,8 @@ def _random_public_ip() -> str:
     """  
     Generate a random public IPv4 address excluding private/reserved ranges.  
     """  
+    import ipaddress  
+  
     # We'll loop until we find a public address outside common reserved blocks.  
     while True:  
         octets = [random.randint(1, 255) for _ in range(4)]  
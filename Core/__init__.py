@@ -0,0 +1,16 @@
+from .store import ItemStore, ItemView
+from .profiling import PROFILER, Profiler, span
+from .events import EVENTS, PROGRESS, EventLog, Progress, LEVELS
+from .cascade import Cascade, QualityCheck, VALIDATORS, parse_tiers, estimate_tokens
+from .journal import ResultJournal
+from .shutdown import SHUTDOWN, Shutdown
+from .watcher import DirectoryWatcher
+
+__all__ = [
+    "ItemStore", "ItemView",
+    "PROFILER", "Profiler", "span",
+    "EVENTS", "PROGRESS", "EventLog", "Progress", "LEVELS",
+    "Cascade", "QualityCheck", "VALIDATORS", "parse_tiers", "estimate_tokens",
+    "ResultJournal", "SHUTDOWN", "Shutdown",
+    "DirectoryWatcher",
+]
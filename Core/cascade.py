@@ -0,0 +1,228 @@
+# cascade.py
+
+import re
+import json
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from .profiling import span
+
+"""
+Cost- and latency-aware model cascade.
+
+A Cascade wraps several provider instances ordered from cheapest to most
+expensive and exposes the same generate(prompt) method as a single
+provider. Each prompt goes to the first tier. It moves to the next tier only
+when the answer fails the quality check or the call raises. The last tier's
+answer is always returned.
+"""
+
+# Appended to prompts for non-final tiers when a confidence threshold is set.
+CONFIDENCE_INSTRUCTION = (
+    "\n\nAfter your answer, add a final line of the form "
+    "'Confidence: <number between 0 and 1>' rating how sure you are that the answer is correct."
+)
+_CONFIDENCE_RE = re.compile(
+    r"\n?[ \t]*\**confidence(?:\**[ \t]*[:=]|[ \t]*[:=][ \t]*\**)[ \t]*([0-9]*\.?[0-9]+)[ \t]*(%?)[ \t]*\**\s*$",
+    re.IGNORECASE,
+)
+
+_REFUSAL_PREFIXES = (
+    "i'm sorry", "i am sorry", "i cannot", "i can't", "as an ai", "i'm unable", "i am unable",
+)
+
+
+def _valid_json(text: str) -> bool:
+    body = text.strip()
+    if body.startswith("```"):
+        body = body.strip("`")
+        body = body[body.find("\n") + 1:] if "\n" in body else body
+    try:
+        json.loads(body)
+        return True
+    except ValueError:
+        return False
+
+
+VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "nonempty": lambda text: bool(text.strip()),
+    "no_refusal": lambda text: not text.strip().lower().startswith(_REFUSAL_PREFIXES),
+    "json": _valid_json,
+}
+
+
+def split_confidence(text: str) -> Tuple[str, Optional[float]]:
+    """
+    Strips a trailing 'Confidence: x' line from a model answer.
+    Returns the cleaned answer and the confidence in [0, 1], or None.
+    """
+    match = _CONFIDENCE_RE.search(text)
+    if not match:
+        return text, None
+    value = float(match.group(1))
+    if match.group(2) or value > 1:
+        value /= 100
+    return text[:match.start()].rstrip(), min(max(value, 0.0), 1.0)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); providers don't return usage."""
+    return (len(text) + 3) // 4
+
+
+class QualityCheck:
+    """
+    Decides whether a tier's answer is good enough to keep.
+    Every configured criterion has to pass.
+    """
+
+    def __init__(
+        self,
+        min_chars: int = 0,
+        min_confidence: Optional[float] = None,
+        validators: Optional[List[str]] = None,
+    ) -> None:
+        unknown = [name for name in validators or [] if name not in VALIDATORS]
+        if unknown:
+            raise ValueError(f"Unknown cascade validator(s): {', '.join(unknown)}")
+        self.min_chars = min_chars
+        self.min_confidence = min_confidence
+        self.validators = [VALIDATORS[name] for name in validators or []]
+
+    def __call__(self, text: str, confidence: Optional[float]) -> Optional[str]:
+        """Returns None if the answer passes, else the reason for escalating."""
+        if not text.strip():
+            return "empty"
+        if len(text.strip()) < self.min_chars:
+            return "length"
+        if self.min_confidence is not None and (confidence is None or confidence < self.min_confidence):
+            return "confidence"
+        for validator in self.validators:
+            if not validator(text):
+                return "validator"
+        return None
+
+
+class TierStats:
+    __slots__ = ("calls", "accepted", "escalated", "errors", "latency", "prompt_tokens", "output_tokens", "reasons")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.accepted = 0
+        self.escalated = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.reasons: Dict[str, int] = {}
+
+
+class Cascade:
+    """
+    Drop-in replacement for a provider instance that escalates through tiers.
+    `tiers` is a list of (label, provider) pairs, cheapest first.
+    """
+
+    def __init__(self, tiers: List[Tuple[str, object]], check: QualityCheck) -> None:
+        if not tiers:
+            raise ValueError("A cascade needs at least one tier.")
+        self.tiers = tiers
+        self.check = check
+        self._lock = threading.Lock()
+        self._stats = {label: TierStats() for label, _ in tiers}
+
+    def generate(self, prompt: str) -> str:
+        last = len(self.tiers) - 1
+        for level, (label, provider) in enumerate(self.tiers):
+            final = level == last
+            asks_confidence = not final and self.check.min_confidence is not None
+            tier_prompt = prompt + CONFIDENCE_INSTRUCTION if asks_confidence else prompt
+
+            start = time.perf_counter()
+            try:
+                with span("tier", tier=label):
+                    output = provider.generate(prompt=tier_prompt)
+            except Exception:
+                self._record(label, tier_prompt, "", time.perf_counter() - start, "error", escalated=not final)
+                if final:
+                    raise
+                continue
+            elapsed = time.perf_counter() - start
+
+            # Only strip a confidence line we asked for; otherwise it is part of the answer
+            if asks_confidence:
+                text, confidence = split_confidence(output or "")
+            else:
+                text, confidence = output or "", None
+            if final:
+                self._record(label, tier_prompt, output or "", elapsed, None)
+                return text
+            reason = self.check(text, confidence)
+            self._record(label, tier_prompt, output or "", elapsed, reason)
+            if reason is None:
+                return text
+        return ""
+
+    def _record(
+        self, label: str, prompt: str, output: str, elapsed: float, reason: Optional[str], escalated: bool = True
+    ) -> None:
+        with self._lock:
+            stats = self._stats[label]
+            stats.calls += 1
+            stats.latency += elapsed
+            stats.prompt_tokens += estimate_tokens(prompt)
+            stats.output_tokens += estimate_tokens(output)
+            if reason == "error":
+                stats.errors += 1
+            if reason is None:
+                stats.accepted += 1
+            elif escalated:
+                # The last tier has nowhere to escalate; its errors only count as errors
+                stats.escalated += 1
+                stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+
+    # --- Reporting ---
+    def stats(self) -> List[dict]:
+        with self._lock:
+            rows = []
+            for label, _ in self.tiers:
+                s = self._stats[label]
+                rows.append({
+                    "tier": label,
+                    "calls": s.calls,
+                    "accepted": s.accepted,
+                    "escalated": s.escalated,
+                    "escalation_rate": s.escalated / s.calls if s.calls else 0.0,
+                    "errors": s.errors,
+                    "mean_latency": s.latency / s.calls if s.calls else 0.0,
+                    "est_prompt_tokens": s.prompt_tokens,
+                    "est_output_tokens": s.output_tokens,
+                    "reasons": dict(s.reasons),
+                })
+        return rows
+
+    def format_stats(self, rows: List[dict]) -> str:
+        lines = [f"{'tier':<40}{'calls':>7}{'escal.':>8}{'rate':>8}{'mean s':>9}{'~tok in':>10}{'~tok out':>10}"]
+        for row in rows:
+            lines.append(
+                f"{row['tier']:<40}{row['calls']:>7}{row['escalated']:>8}{row['escalation_rate']:>8.1%}"
+                f"{row['mean_latency']:>9.2f}{row['est_prompt_tokens']:>10}{row['est_output_tokens']:>10}"
+            )
+        return "\n".join(lines)
+
+
+def parse_tiers(spec: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Parses 'provider[:model],provider[:model],...' into (provider, model) pairs.
+    The model is None when it is omitted, which means the provider's default.
+    """
+    tiers = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        provider, _, model = part.partition(":")
+        tiers.append((provider.strip().lower(), model.strip() or None))
+    if not tiers:
+        raise ValueError("Empty cascade specification.")
+    return tiers
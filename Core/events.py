@@ -0,0 +1,231 @@
+# events.py
+
+import sys
+import json
+import atexit
+import time
+import queue
+import threading
+from typing import Optional, TextIO
+from Config.config import (
+    BOLD_BRIGHT_CYAN,
+    BOLD_BRIGHT_RED,
+    BOLD_BRIGHT_YELLOW,
+    RESET,
+)
+
+"""
+Structured event log and live progress line.
+
+Workers call EVENTS.debug/info/warning/error with an event name, a message
+template and raw fields. Records below the configured level are dropped
+before anything is built. Accepted records go onto a queue, and a
+background thread does all JSON encoding, template formatting and I/O, so
+worker threads never block on the terminal or the log file.
+"""
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+_LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+_LEVEL_COLORS = {
+    DEBUG: BOLD_BRIGHT_CYAN,
+    INFO: BOLD_BRIGHT_CYAN,
+    WARNING: BOLD_BRIGHT_YELLOW,
+    ERROR: BOLD_BRIGHT_RED,
+}
+_CLEAR_LINE = "\r\033[K"
+_STOP = object()
+
+
+class EventLog:
+    """
+    Queue-backed event sink writing JSON lines to a file and, optionally,
+    colored messages to the console.
+    """
+
+    def __init__(self) -> None:
+        self.level = INFO           # lowest level accepted by any sink
+        self.file_level = INFO
+        self.console_level = INFO
+        self._file: Optional[TextIO] = None
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def configure(self, level: str = "info", path: Optional[str] = None, console_level: Optional[str] = None) -> None:
+        """
+        Sets the log levels and opens the JSON-lines file, if any.
+        With a file, the console defaults to info so that debug events go
+        to the file only. Without one, nothing below the console level is
+        ever queued.
+        """
+        if console_level is not None:
+            self.console_level = LEVELS[console_level]
+        elif path:
+            self.console_level = max(LEVELS[level], INFO)
+        else:
+            self.console_level = LEVELS[level]
+        self.file_level = LEVELS[level]
+        self.level = min(self.file_level, self.console_level) if path else self.console_level
+        if path:
+            self._file = open(path, "a", encoding="utf-8")
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def emit(self, level: int, event: str, message: str = "", color: Optional[str] = None, **fields) -> None:
+        if level < self.level:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put((time.time(), level, event, message, color, fields))
+
+    def debug(self, event: str, message: str = "", **fields) -> None:
+        self.emit(DEBUG, event, message, **fields)
+
+    def info(self, event: str, message: str = "", **fields) -> None:
+        self.emit(INFO, event, message, **fields)
+
+    def warning(self, event: str, message: str = "", **fields) -> None:
+        self.emit(WARNING, event, message, **fields)
+
+    def error(self, event: str, message: str = "", **fields) -> None:
+        self.emit(ERROR, event, message, **fields)
+
+    def close(self) -> None:
+        """Flushes every queued record and stops the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # --- Writer thread ---
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            self._write(record)
+            # Drain whatever else is already queued before flushing.
+            while True:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    self._flush()
+                    return
+                self._write(record)
+            self._flush()
+
+    def _write(self, record) -> None:
+        ts, level, event, message, color, fields = record
+        if self._file is not None and level >= self.file_level:
+            line = {"ts": round(ts, 6), "level": _LEVEL_NAMES[level], "event": event}
+            line.update(fields)
+            self._file.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        if level >= self.console_level and message:
+            try:
+                text = message.format(**fields)
+            except (KeyError, IndexError, ValueError):
+                text = message
+            prefix = _CLEAR_LINE if PROGRESS.active else ""
+            sys.stdout.write(f"{prefix}{color or _LEVEL_COLORS[level]}{text}{RESET}\n")
+
+    def _flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+        sys.stdout.flush()
+
+
+class Progress:
+    """
+    Counters for the live progress line (done, rate, ETA, in-flight, errors).
+    Updates are plain integer bumps under a lock; rendering happens on a
+    background ticker and only when stderr is a terminal.
+    """
+
+    def __init__(self, interval: float = 1.0, stream: TextIO = sys.stderr) -> None:
+        self.interval = interval
+        self.stream = stream
+        self.active = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reset(0)
+
+    def reset(self, total: int, label: str = "") -> None:
+        with self._lock:
+            self.total = total
+            self.label = label
+            self.done = 0
+            self.errors = 0
+            self.in_flight = 0
+            self.started = time.perf_counter()
+
+    def submitted(self, count: int = 1) -> None:
+        with self._lock:
+            self.in_flight += count
+
+    def finished(self, ok: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if ok:
+                self.done += 1
+            else:
+                self.errors += 1
+
+    def render(self) -> str:
+        with self._lock:
+            done, errors, in_flight, total = self.done, self.errors, self.in_flight, self.total
+            elapsed = time.perf_counter() - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(total - done - errors, 0)
+        eta = _format_duration(remaining / rate) if rate > 0 else "--:--"
+        return (
+            f"{self.label} {done}/{total} done | {rate:.2f} it/s | ETA {eta} "
+            f"| in-flight {in_flight} | errors {errors}"
+        )
+
+    def start(self) -> None:
+        if self._thread is not None or not self.stream.isatty():
+            return
+        self.active = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.active = False
+        self.stream.write(_CLEAR_LINE + self.render() + "\n")
+        self.stream.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.stream.write(_CLEAR_LINE + self.render())
+            self.stream.flush()
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+EVENTS = EventLog()
+PROGRESS = Progress()
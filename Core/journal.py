@@ -0,0 +1,70 @@
+# journal.py
+
+import os
+import json
+import zlib
+from typing import Optional, TextIO
+
+"""
+Write-ahead journal of finished outputs.
+
+Every output is appended and fsynced to `<dataset>.journal` as soon as
+its request completes, before the dataset file itself is rewritten. If the
+process dies before the next save, the journal is replayed on restart. An
+entry is applied only when the item still has no output and its
+instruction checksum still matches, so each output is committed exactly
+once.
+"""
+
+
+def _checksum(text: Optional[str]) -> int:
+    return zlib.crc32((text or "").encode("utf-8"))
+
+
+class ResultJournal:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: Optional[TextIO] = None
+
+    def replay(self, store) -> int:
+        """Applies journaled outputs to `store`. Returns how many were applied."""
+        if not os.path.exists(self.path):
+            return 0
+        applied = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    index = entry["i"]
+                    output = entry["output"]
+                    crc = entry["crc"]
+                except (ValueError, KeyError, TypeError):
+                    continue  # torn last line from a crash mid-write
+                if not (0 <= index < len(store)) or store.has_output(index):
+                    continue
+                if _checksum(store.get(index, "instruction")) != crc:
+                    continue
+                store.set_output(index, output)
+                applied += 1
+        return applied
+
+    def append(self, store, index: int, output: str) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        entry = {"i": index, "crc": _checksum(store.get(index, "instruction")), "output": output}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def clear(self) -> None:
+        """Drops the journal once its entries are durably in the dataset file."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,154 @@
+# profiling.py
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+"""
+Lightweight per-stage timing spans.
+
+Spans are no-ops until the profiler is enabled (see --profile in main.py),
+so the hot path only pays for an attribute check when profiling is off.
+When enabled, every span feeds a per-stage summary and a trace that can be
+written as Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope)
+or as collapsed stacks for flamegraph.pl.
+
+Only the most recent `max_events` spans are kept for the Chrome trace, so a
+long-running `--watch` process stays bounded. The per-stage summary and the
+collapsed stacks are aggregates and always cover the whole run.
+"""
+
+_NULL_SPAN = nullcontext()
+DEFAULT_MAX_EVENTS = 200_000
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "args", "start", "child_time")
+
+    def __init__(self, profiler: "Profiler", name: str, args: Optional[dict]) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.child_time = 0.0
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        stack = self.profiler._stack()
+        stack.pop()
+        duration = end - self.start
+        if stack:
+            stack[-1].child_time += duration
+        path = ";".join([s.name for s in stack] + [self.name])
+        self.profiler._record(self, path, duration, duration - self.child_time)
+        return False
+
+
+class Profiler:
+    """
+    Collects timing spans from any thread.
+    Use `with PROFILER.span("stage"):` around the code to measure.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._stats: Dict[str, List[float]] = {}
+        self._events: deque = deque(maxlen=DEFAULT_MAX_EVENTS)
+        self._dropped = 0
+        self._folded: Dict[str, float] = {}
+
+    def enable(self, max_events: int = DEFAULT_MAX_EVENTS) -> None:
+        self._origin = time.perf_counter()
+        self._events = deque(maxlen=max_events)
+        self._dropped = 0
+        self.enabled = True
+
+    def span(self, name: str, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args or None)
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span: _Span, path: str, duration: float, self_time: float) -> None:
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": (span.start - self._origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if span.args:
+            event["args"] = span.args
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            self._folded[path] = self._folded.get(path, 0.0) + self_time
+            if len(self._events) == self._events.maxlen:
+                self._dropped += 1
+            self._events.append(event)
+
+    # --- Reporting ---
+    def summary(self, reset: bool = True) -> List[Tuple[str, int, float, float]]:
+        """
+        Returns (stage, count, total seconds, max seconds) rows, slowest first.
+        The trace itself is kept so it can still be written at exit.
+        """
+        with self._lock:
+            rows = [(name, int(s[0]), s[1], s[2]) for name, s in self._stats.items()]
+            if reset:
+                self._stats = {}
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def format_summary(self, rows: List[Tuple[str, int, float, float]]) -> str:
+        lines = [f"{'stage':<16}{'calls':>8}{'total s':>12}{'mean ms':>12}{'max ms':>12}"]
+        for name, count, total, longest in rows:
+            mean = total / count * 1000 if count else 0.0
+            lines.append(f"{name:<16}{count:>8}{total:>12.3f}{mean:>12.1f}{longest * 1000:>12.1f}")
+        return "\n".join(lines)
+
+    def write_trace(self, path: str) -> None:
+        """
+        Writes collapsed stacks (microseconds of self time) for `.folded`/`.txt`
+        paths, and Chrome trace-event JSON otherwise.
+        """
+        with self._lock:
+            events = list(self._events)
+            dropped = self._dropped
+            folded = dict(self._folded)
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            if path.endswith((".folded", ".txt")):
+                for stack, seconds in sorted(folded.items()):
+                    f.write(f"{stack} {int(seconds * 1e6)}\n")
+            else:
+                trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+                if dropped:
+                    trace["otherData"] = {"dropped_events": dropped}
+                json.dump(trace, f)
+        os.replace(temp_path, path)
+
+
+PROFILER = Profiler()
+span = PROFILER.span
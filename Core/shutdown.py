@@ -0,0 +1,66 @@
+# shutdown.py
+
+import signal
+import threading
+import time
+from typing import Optional
+
+"""
+Graceful shutdown on SIGINT/SIGTERM.
+
+The first signal only sets a flag: no new items are dispatched, retry
+loops stop, and in-flight requests get `drain_timeout` seconds to finish so
+their outputs can be committed. A second signal aborts immediately with
+KeyboardInterrupt.
+"""
+
+
+class Shutdown:
+    def __init__(self, drain_timeout: float = 30.0) -> None:
+        self.drain_timeout = drain_timeout
+        self.reason: Optional[str] = None
+        self.signum: Optional[int] = None
+        self._event = threading.Event()
+        self._requested_at: Optional[float] = None
+
+    def install(self) -> None:
+        """Registers the signal handlers. Must be called from the main thread."""
+        signal.signal(signal.SIGINT, self._handle)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, self._handle)
+
+    def _handle(self, signum, frame) -> None:
+        if self._event.is_set():
+            # Second signal: stop waiting for in-flight work.
+            signal.signal(signum, signal.SIG_DFL)
+            raise KeyboardInterrupt
+        self.signum = signum
+        self.request(signal.Signals(signum).name)
+
+    def request(self, reason: str = "requested") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._requested_at = time.monotonic()
+            self._event.set()
+
+    @property
+    def requested(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleeps up to `timeout` seconds; returns True early if shutdown was requested."""
+        return self._event.wait(timeout)
+
+    @property
+    def exit_code(self) -> int:
+        """Conventional 128 + signal number, or 1 for programmatic requests."""
+        return 128 + self.signum if self.signum else 1
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left to drain in-flight work, or None while running normally."""
+        if self._requested_at is None:
+            return None
+        return max(self.drain_timeout - (time.monotonic() - self._requested_at), 0.0)
+
+
+SHUTDOWN = Shutdown()
@@ -0,0 +1,278 @@
+# store.py
+
+import json
+from array import array
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+"""
+Compact in-process item store for dataset files.
+
+Instead of keeping every row as a Python dict, the fields of all rows are
+UTF-8 encoded into a single bytearray (the arena) and addressed through an
+offset array. Fields are decoded only when a worker actually asks for them.
+Generated outputs are encoded into a second bytearray and addressed through
+per-item (offset, length) arrays, so they never live as Python strings.
+"""
+
+FIELDS = ("instruction", "input", "output")
+_EXTRA = len(FIELDS)              # slot holding JSON of any other keys
+_SLOTS = len(FIELDS) + 1          # segments stored per item
+_OUTPUT = FIELDS.index("output")
+
+_WS = json.decoder.WHITESPACE
+_DECODER = json.JSONDecoder()
+_MISSING = object()
+# Errors this close to the end of the buffer may just be a value cut off
+# mid-token (e.g. "tr" of "true", or a short \uXXXX escape).
+_TRUNCATION_SLACK = 16
+
+
+def _is_truncation(err: json.JSONDecodeError, buf: str) -> bool:
+    return err.msg.startswith("Unterminated string") or len(buf) - err.pos <= _TRUNCATION_SLACK
+
+
+def _iter_json_array(f: TextIO, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Yields the elements of a top-level JSON array one by one, reading the
+    file in chunks so that the whole document is never held in memory.
+    """
+    buf = f.read(chunk_size)
+    eof = not buf
+    pos = 0
+
+    def _fill():
+        nonlocal buf, pos, eof
+        # Read at least as much as is buffered, so a huge item is copied O(log n) times
+        chunk = f.read(max(chunk_size, len(buf) - pos))
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def _skip_ws():
+        nonlocal pos
+        pos = _WS.match(buf, pos).end()
+        while pos >= len(buf) and not eof:
+            _fill()
+            pos = _WS.match(buf, pos).end()
+
+    _skip_ws()
+    if not buf.startswith("[", pos):
+        raise json.JSONDecodeError("Expecting '['", buf, pos)
+    pos += 1
+    _skip_ws()
+    if buf.startswith("]", pos):
+        return
+
+    while True:
+        try:
+            value, end = _DECODER.raw_decode(buf, pos)
+        except json.JSONDecodeError as err:
+            if eof or not _is_truncation(err, buf):
+                raise
+            _fill()
+            continue
+        if end >= len(buf) and not eof:
+            # The value may continue past the buffer (e.g. a split number).
+            _fill()
+            continue
+        if not isinstance(value, dict):
+            raise json.JSONDecodeError("Expecting an object", buf, pos)
+
+        yield value
+        pos = end
+        _skip_ws()
+        if buf.startswith("]", pos):
+            pos += 1
+            _skip_ws()
+            if pos < len(buf):
+                raise json.JSONDecodeError("Extra data", buf, pos)
+            return
+        if not buf.startswith(",", pos):
+            raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+        pos += 1
+        _skip_ws()
+
+
+class ItemView:
+    """
+    Lightweight handle to one row of an ItemStore. Behaves like a read-only
+    dict for the fields the generator needs, decoding them on demand.
+    """
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: "ItemStore", index: int) -> None:
+        self.store = store
+        self.index = index
+
+    def get(self, key: str, default=None):
+        return self.store.get(self.index, key, default)
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class ItemStore:
+    """
+    Column-compact storage for a dataset file.
+
+    Every item occupies four consecutive segments in the arena: instruction,
+    input, output and a JSON blob of any remaining keys. A per-item flag byte
+    records which of the known fields were present as strings, so files are
+    written back with the same keys they were loaded with. The original key
+    order is kept as an index into a table of distinct key orders, which is
+    tiny for real datasets. Generated outputs go to a separate arena; an
+    item's entry there replaces its loaded output.
+    """
+
+    def __init__(self) -> None:
+        self._arena = bytearray()
+        self._offsets = array("q", [0])
+        self._flags = bytearray()
+        self._shapes: List[Tuple[str, ...]] = []
+        self._shape_ids: Dict[Tuple[str, ...], int] = {}
+        self._item_shapes = array("I")
+        self._generated = bytearray()
+        self._gen_offsets = array("q")   # -1 until an output is generated
+        self._gen_lengths = array("q")
+
+    @classmethod
+    def load(cls, filepath: str) -> "ItemStore":
+        store = cls()
+        with open(filepath, "r", encoding="utf-8") as f:
+            for item in _iter_json_array(f):
+                store.append(item)
+        return store
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def append(self, item: dict) -> None:
+        flags = 0
+        extra = {}
+        for key, value in item.items():
+            if key in FIELDS and isinstance(value, str):
+                continue
+            extra[key] = value
+
+        for slot, field in enumerate(FIELDS):
+            value = item.get(field)
+            if isinstance(value, str):
+                flags |= 1 << slot
+                self._arena += value.encode("utf-8")
+            self._offsets.append(len(self._arena))
+
+        if extra:
+            self._arena += json.dumps(extra, ensure_ascii=False).encode("utf-8")
+        self._offsets.append(len(self._arena))
+        self._flags.append(flags)
+
+        shape = tuple(item)
+        shape_id = self._shape_ids.get(shape)
+        if shape_id is None:
+            shape_id = self._shape_ids[shape] = len(self._shapes)
+            self._shapes.append(shape)
+        self._item_shapes.append(shape_id)
+        self._gen_offsets.append(-1)
+        self._gen_lengths.append(0)
+
+    # --- Field access ---
+    def _segment(self, index: int, slot: int) -> bytes:
+        base = index * _SLOTS + slot
+        return self._arena[self._offsets[base]:self._offsets[base + 1]]
+
+    def _generated_output(self, index: int) -> Optional[str]:
+        start = self._gen_offsets[index]
+        if start < 0:
+            return None
+        return self._generated[start:start + self._gen_lengths[index]].decode("utf-8")
+
+    def _extra(self, index: int) -> dict:
+        raw = self._segment(index, _EXTRA)
+        return json.loads(raw) if raw else {}
+
+    def get(self, index: int, key: str, default=None):
+        if key == "output" and self._gen_offsets[index] >= 0:
+            return self._generated_output(index)
+        if key in FIELDS:
+            slot = FIELDS.index(key)
+            if self._flags[index] & (1 << slot):
+                return self._segment(index, slot).decode("utf-8")
+        return self._extra(index).get(key, default)
+
+    def item(self, index: int) -> ItemView:
+        return ItemView(self, index)
+
+    def to_dict(self, index: int) -> dict:
+        """Decodes a full item in its original key order, including any generated output."""
+        flags = self._flags[index]
+        extra = self._extra(index) if self._segment(index, _EXTRA) else {}
+        generated = self._generated_output(index)
+        item = {}
+        for key in self._shapes[self._item_shapes[index]]:
+            if key == "output" and generated is not None:
+                item[key] = generated
+            elif key in FIELDS and flags & (1 << FIELDS.index(key)):
+                item[key] = self._segment(index, FIELDS.index(key)).decode("utf-8")
+            else:
+                item[key] = extra[key]
+        if generated is not None and "output" not in item:
+            item["output"] = generated
+        return item
+
+    # --- Resume state ---
+    def has_output(self, index: int) -> bool:
+        if self._gen_offsets[index] >= 0:
+            return self._gen_lengths[index] > 0
+        if self._flags[index] & (1 << _OUTPUT):
+            base = index * _SLOTS + _OUTPUT
+            return self._offsets[base + 1] > self._offsets[base]
+        # Non-string outputs are kept with the extra keys.
+        return bool(self._extra(index).get("output")) if self._segment(index, _EXTRA) else False
+
+    def pending_count(self) -> int:
+        return sum(1 for i in range(len(self)) if not self.has_output(i))
+
+    def set_output(self, index: int, output: str) -> None:
+        encoded = output.encode("utf-8")
+        self._gen_offsets[index] = len(self._generated)
+        self._gen_lengths[index] = len(encoded)
+        self._generated += encoded
+
+    def pending(self, start: int = 0, stop: Optional[int] = None) -> list:
+        """Indices in [start, stop) whose output is still empty."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [i for i in range(start, stop) if not self.has_output(i)]
+
+    # --- Serialization ---
+    def dump(self, f: TextIO) -> None:
+        """
+        Writes the store as a JSON array, one item at a time. The layout is
+        identical to json.dump(data, f, ensure_ascii=False, indent=4).
+        """
+        if not len(self):
+            f.write("[]")
+            return
+        f.write("[")
+        for index in range(len(self)):
+            if index:
+                f.write(",")
+            text = json.dumps(self.to_dict(index), ensure_ascii=False, indent=4)
+            f.write("\n    " + text.replace("\n", "\n    "))
+        f.write("\n]")
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the arena and index arrays."""
+        return (
+            len(self._arena)
+            + len(self._generated)
+            + self._offsets.itemsize * len(self._offsets)
+            + self._gen_offsets.itemsize * (len(self._gen_offsets) + len(self._gen_lengths))
+            + len(self._flags)
+        )
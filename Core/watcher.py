@@ -0,0 +1,231 @@
+# watcher.py
+
+import os
+import sys
+import time
+import select
+import struct
+from typing import Dict, List, Optional, Tuple
+
+"""
+Directory watcher for continuous ingestion of dataset files.
+
+On Linux the watcher listens for inotify close-after-write and move-into
+events through libc (no extra dependency). Elsewhere, or if inotify is
+unavailable, it falls back to polling the directory. With either backend, a
+file is handed out only after its size and mtime have stopped changing for
+`settle` seconds. It is handed out again only when it differs from the
+version last marked as processed, so the generator's own saves never
+re-trigger it. Files that could not be handled yet are deferred with
+`retry_later` and come back after a backoff, or sooner if they change.
+
+Only inotify's close-after-write reliably means "fully written". Polling
+can only see that size and mtime stopped changing, so a writer that pauses
+longer than `settle` may be picked up half-written. Upstream jobs should
+write to a temporary name and rename it into place.
+"""
+
+Signature = Tuple[int, int]  # (size, mtime_ns)
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _signature(path: str) -> Optional[Signature]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class _InotifyBackend:
+    name = "inotify"
+
+    def __init__(self, directory: str) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        self.fd = fd
+
+    def wait(self, timeout: float) -> Optional[List[str]]:
+        """Returns names of touched files, or None if events were lost and a rescan is needed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _PollingBackend:
+    name = "polling"
+
+    def __init__(self, directory: str, interval: float = 1.0) -> None:
+        self.interval = interval
+
+    def wait(self, timeout: float) -> Optional[List[str]]:
+        time.sleep(min(timeout, self.interval))
+        return None  # always rescan
+
+    def close(self) -> None:
+        pass
+
+
+class DirectoryWatcher:
+    """
+    Reports dataset files that are new or changed and fully written.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        suffix: str = ".json",
+        settle: float = 2.0,
+        force_polling: bool = False,
+        retry_delay: float = 30.0,
+        max_retry_delay: float = 900.0,
+    ) -> None:
+        self.directory = directory
+        self.suffix = suffix
+        self.settle = settle
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._processed: Dict[str, Signature] = {}
+        self._candidates: Dict[str, Tuple[Signature, float]] = {}
+        self._deferred: Dict[str, Tuple[Signature, float]] = {}
+        self._attempts: Dict[str, int] = {}
+
+        self.backend = None
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                self.backend = _InotifyBackend(directory)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = _PollingBackend(directory)
+
+        # Files already present at startup are picked up like a normal run.
+        self._rescan()
+
+    def _rescan(self) -> None:
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                self._touch(entry.name)
+
+    def _touch(self, name: str) -> None:
+        if not name.endswith(self.suffix):
+            return
+        path = os.path.join(self.directory, name)
+        signature = _signature(path)
+        if signature is None or signature == self._processed.get(path):
+            return
+        deferred = self._deferred.get(path)
+        if deferred is not None:
+            if deferred[0] == signature:
+                return  # unchanged; wait for the backoff to expire
+            del self._deferred[path]
+        previous = self._candidates.get(path)
+        if previous is None or previous[0] != signature:
+            self._candidates[path] = (signature, time.monotonic())
+
+    def poll(self, timeout: float = 1.0) -> List[str]:
+        """
+        Waits up to `timeout` seconds for activity, then returns the files that
+        have settled since they last changed, oldest change first.
+        """
+        wait_for = timeout
+        if self._candidates:
+            # Wake up in time to hand out the next file that settles.
+            now = time.monotonic()
+            next_ready = min(seen + self.settle for _, seen in self._candidates.values())
+            wait_for = max(min(timeout, next_ready - now), 0.0)
+
+        if self._deferred:
+            next_retry = min(due for _, due in self._deferred.values())
+            wait_for = max(min(wait_for, next_retry - time.monotonic()), 0.0)
+
+        names = self.backend.wait(wait_for)
+        if names is None:
+            self._rescan()
+        else:
+            for name in names:
+                self._touch(name)
+
+        now = time.monotonic()
+        for path, (signature, due) in list(self._deferred.items()):
+            if now >= due:
+                del self._deferred[path]
+                current = _signature(path)
+                if current is not None:
+                    # Already settled once; hand it out on this poll
+                    self._candidates[path] = (current, now - self.settle)
+
+        ready = []
+        now = time.monotonic()
+        for path, (signature, seen) in list(self._candidates.items()):
+            current = _signature(path)
+            if current is None:
+                del self._candidates[path]  # removed before it settled
+            elif current != signature:
+                self._candidates[path] = (current, now)
+            elif now - seen >= self.settle:
+                del self._candidates[path]
+                if current != self._processed.get(path):
+                    ready.append((seen, path))
+        return [path for _, path in sorted(ready)]
+
+    def mark_processed(self, path: str) -> None:
+        """Records the file's current version so only later changes re-trigger it."""
+        signature = _signature(path)
+        if signature is not None:
+            self._processed[path] = signature
+        self._candidates.pop(path, None)
+        self._deferred.pop(path, None)
+        self._attempts.pop(path, None)
+
+    def retry_later(self, path: str) -> float:
+        """
+        Defers a file that could not be fully handled. It is offered again after
+        an exponential backoff, or as soon as it changes on disk.
+        Returns the delay in seconds.
+        """
+        attempts = self._attempts.get(path, 0)
+        self._attempts[path] = attempts + 1
+        delay = min(self.retry_delay * (2 ** attempts), self.max_retry_delay)
+        self._candidates.pop(path, None)
+        self._processed.pop(path, None)
+        signature = _signature(path)
+        if signature is not None:
+            self._deferred[path] = (signature, time.monotonic() + delay)
+        return delay
+
+    def close(self) -> None:
+        self.backend.close()
@@ -44,6 +44,7 @@ class Cerebras:
         self.config_file_path = os.path.join(self.config_dir, "Cerebras-Config.json")
 
         self.api_key = None
+        self.session = requests.Session()
 
         # --- Main initialization logic ---
         if self.cookies_or_api_key and self.cookies_or_api_key.startswith('cookieyes-consent'):
@@ -137,7 +138,7 @@ class Cerebras:
         }
         
         try:
-            response = requests.post('https://api.cerebras.ai/v1/chat/completions', headers=headers, json=json_data, timeout=self.timeout)
+            response = self.session.post('https://api.cerebras.ai/v1/chat/completions', headers=headers, json=json_data, timeout=self.timeout)
             
             if response.status_code == 401 and self.cookies_or_api_key and self.cookies_or_api_key.startswith('cookieyes'):
                 print("🚨 Demo API key expired. Refreshing...")
@@ -146,7 +147,7 @@ class Cerebras:
                 if self.api_key: # check if refresh worked
                      # Re-create headers
                     headers['authorization'] = f'Bearer {self.api_key}'
-                    response = requests.post('https://api.cerebras.ai/v1/chat/completions', headers=headers, json=json_data, timeout=self.timeout)
+                    response = self.session.post('https://api.cerebras.ai/v1/chat/completions', headers=headers, json=json_data, timeout=self.timeout)
                     response.raise_for_status()
                     return response.json()['choices'][0]['message']['content']
 
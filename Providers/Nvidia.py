@@ -42,6 +42,7 @@ class Nvidia:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
+        self.session = requests.Session()
 
     def generate(self, prompt: str) -> str:
         payload = {
@@ -56,7 +57,7 @@ class Nvidia:
             "stream": False
         }
         try:
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=self.timeout)
+            response = self.session.post(self.api_url, headers=self.headers, json=payload, timeout=self.timeout)
             response.raise_for_status() 
             return response.json()["choices"][0]["message"]["content"]
         except Exception as e:
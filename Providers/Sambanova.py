@@ -43,6 +43,7 @@ class Sambanova:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        self.session = requests.Session()
     
     def generate(self, prompt: str) -> str:
         payload = {
@@ -57,7 +58,7 @@ class Sambanova:
             "stream": False
         }
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.base_url, 
                 headers=self.headers,
                 json=payload,
@@ -1,6 +1,41 @@
-from .DeepInfra import DeepInfra
-from .Nvidia import Nvidia
-from .Cerebras import Cerebras
-from .Sambanova import Sambanova
+import sys
+import types
+import importlib
 
-__all__ = ["DeepInfra", "Nvidia", "Cerebras", "Sambanova"]
\ No newline at end of file
+# Provider name -> module/class name. Modules are imported only when requested,
+# so choosing one provider never pays for importing the others.
+_PROVIDERS = {
+    "nvidia": "Nvidia",
+    "cerebras": "Cerebras",
+    "deepinfra": "DeepInfra",
+    "sambanova": "Sambanova",
+}
+
+PROVIDER_NAMES = list(_PROVIDERS)
+
+def get_provider(name: str):
+    """Imports and returns the provider class registered under `name`."""
+    class_name = _PROVIDERS.get(name.lower())
+    if class_name is None:
+        raise ValueError(f"Unknown provider: {name}")
+    provider_class = getattr(importlib.import_module(f".{class_name}", __name__), class_name)
+    # Importing the submodule binds the module object here; expose the class instead
+    globals()[class_name] = provider_class
+    return provider_class
+
+def __getattr__(name: str):
+    # Keeps `from Providers import Nvidia` working without eager imports
+    if name in _PROVIDERS.values():
+        return get_provider(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _ProvidersModule(types.ModuleType):
+    def __setattr__(self, name, value):
+        # `import Providers.Nvidia` binds the submodule here; keep the class, as eager imports did
+        if name in _PROVIDERS.values() and isinstance(value, types.ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _ProvidersModule
+
+__all__ = ["DeepInfra", "Nvidia", "Cerebras", "Sambanova", "PROVIDER_NAMES", "get_provider"]
@@ -1,9 +1,8 @@
 import os
 import json
-import time
 import random
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from Config.config import (
     BOLD_BRIGHT_CYAN,
     BOLD_BRIGHT_GREEN,
@@ -13,145 +12,387 @@ from Config.config import (
     RESET,
     DATASET_FILES_DIR
 )
-from Providers import Nvidia, Cerebras, DeepInfra, Sambanova
+from Providers import PROVIDER_NAMES, get_provider
+from Core import (
+    ItemStore,
+    PROFILER,
+    span,
+    EVENTS,
+    PROGRESS,
+    LEVELS,
+    Cascade,
+    QualityCheck,
+    VALIDATORS,
+    parse_tiers,
+    DirectoryWatcher,
+    estimate_tokens,
+    ResultJournal,
+    SHUTDOWN,
+)
 
-# --- Provider Mapping ---
-PROVIDERS = {
-    "nvidia": Nvidia,
-    "cerebras": Cerebras,
-    "deepinfra": DeepInfra,
-    "sambanova": Sambanova
-}
+# --- Cascade ---
+def build_cascade(spec, min_chars=0, min_confidence=None, validators=None):
+    """
+    Builds a Cascade from a 'provider[:model],...' spec, cheapest tier first.
+    """
+    tiers = []
+    for provider_name, model in parse_tiers(spec):
+        provider = get_provider(provider_name)(**({"model": model} if model else {}))
+        tiers.append((f"{provider_name}:{provider.model}", provider))
+    check = QualityCheck(min_chars=min_chars, min_confidence=min_confidence, validators=validators)
+    return Cascade(tiers, check)
 
 # --- File I/O ---
 def load_data(filepath):
+    """
+    Loads a dataset file into a compact ItemStore.
+    Items are streamed from disk, so the file is never fully materialized as dicts.
+    """
+    # A leftover .tmp is an unfinished save from a killed run; the real file is intact
+    temp_path = filepath + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+        EVENTS.info("stale_tmp_removed", "🧹 Removed unfinished save {path}", color=BOLD_BRIGHT_YELLOW, path=temp_path)
+
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return ItemStore.load(filepath)
     except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        print(f"{BOLD_BRIGHT_RED}❌ Error decoding JSON from {filepath}{RESET}")
-        return []
+        return None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        EVENTS.error("decode_error", "❌ Error decoding JSON from {file}", file=filepath)
+        return None
 
 def save_data(filepath, data):
     temp_path = filepath + ".tmp"
-    with open(temp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-    os.replace(temp_path, filepath)  # atomic write
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            data.dump(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filepath)  # atomic write
+    finally:
+        # Never leave a partial .tmp behind, even if interrupted mid-write
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 # --- Output Generation ---
+def build_prompt(item):
+    instruction = item.get("instruction", "")
+    input_text = item.get("input", "")
+    return f"Instruction: {instruction}\nInput: {input_text}" if input_text else instruction
+
 def generate_output(item, model_provider):
     """
     Generates model output for a single item with retry logic.
     Runs safely inside threads.
     """
-    instruction = item.get("instruction", "")
-    input_text = item.get("input", "")
-    prompt = f"Instruction: {instruction}\nInput: {input_text}" if input_text else instruction
+    with span("prompt"):
+        prompt = build_prompt(item)
 
     retries = 0
     max_retries = 10  # Prevent infinite loops on hard failures
 
     while retries < max_retries:
         try:
-            output = model_provider.generate(prompt=prompt)
+            with span("generate", provider=type(model_provider).__name__):
+                output = model_provider.generate(prompt=prompt)
 
             if output and isinstance(output, str) and output.strip():
                 return output.strip()
             else:
-                print(f"{BOLD_BRIGHT_RED}⚠️ Empty output received. Retrying...{RESET}")
+                EVENTS.debug("empty_output", "⚠️ Empty output received. Retrying...", color=BOLD_BRIGHT_RED)
         except Exception as e:
-            print(f"{BOLD_BRIGHT_RED}❌ Error while generating output: {e}{RESET}")
+            EVENTS.debug("generate_error", "❌ Error while generating output: {error}", color=BOLD_BRIGHT_RED, error=e)
 
         retries += 1
         wait = random.uniform(2, 5)
-        print(f"{BOLD_BRIGHT_RED}⏳ Retrying in {wait:.1f} seconds... (Attempt {retries}/{max_retries}){RESET}")
-        time.sleep(wait)
+        EVENTS.debug("retry", "⏳ Retrying in {wait:.1f} seconds... (Attempt {attempt}/{max_retries})", color=BOLD_BRIGHT_RED, wait=wait, attempt=retries, max_retries=max_retries)
+        with span("retry_sleep"):
+            if SHUTDOWN.wait(wait):
+                EVENTS.debug("retry_cancelled", "⏹️ Shutdown requested, not retrying.", color=BOLD_BRIGHT_YELLOW)
+                return None
     
-    print(f"{BOLD_BRIGHT_RED}❌ Failed to generate output after {max_retries} attempts.{RESET}")
+    EVENTS.debug("generate_failed", "❌ Failed to generate output after {max_retries} attempts.", color=BOLD_BRIGHT_RED, max_retries=max_retries)
     return None
 
 # --- Main Processing ---
-def process_file(filepath, model_provider, batch_size=3):
-    print(f"{BOLD_BRIGHT_MAGENTA}Processing dataset file: {filepath}{RESET}")
-    data = load_data(filepath)
+def process_file(filepath, model_provider, batch_size=3, executor=None):
+    """
+    Generates outputs for every pending item in a dataset file.
+    Pass a long-lived `executor` to keep worker threads warm across files.
+    Returns the number of items still pending, or None if the file could not be loaded.
+    """
+    EVENTS.info("file_start", "Processing dataset file: {file}", color=BOLD_BRIGHT_MAGENTA, file=filepath)
+    with span("load_data", file=os.path.basename(filepath)):
+        data = load_data(filepath)
+    if data is None:
+        EVENTS.warning("file_skipped", "Skipping invalid file.", color=BOLD_BRIGHT_RED, file=filepath)
+        return None
     if not data:
-        print(f"{BOLD_BRIGHT_RED}Skipping empty or invalid file.{RESET}")
-        return
+        EVENTS.warning("file_skipped", "Skipping empty file.", color=BOLD_BRIGHT_RED, file=filepath)
+        return 0
+
+    # Commit outputs journaled by a run that stopped before its next save
+    journal = ResultJournal(filepath + ".journal")
+    replayed = journal.replay(data)
+    if replayed:
+        save_data(filepath, data)
+        EVENTS.info("journal_replayed", "♻️ Recovered {count} output(s) from the journal of an interrupted run.", color=BOLD_BRIGHT_CYAN, file=filepath, count=replayed)
+    journal.clear()
+
+    total = len(data)
+    PROGRESS.reset(data.pending_count(), label=os.path.basename(filepath))
+    PROGRESS.start()
+    try:
+        _process_batches(filepath, data, model_provider, batch_size, journal, executor)
+    finally:
+        PROGRESS.stop()
+        journal.close()
+
+    # Per-item failures are debug events; report them once per file instead
+    if PROGRESS.errors:
+        EVENTS.warning("items_failed", "⚠️ {count} item(s) in {file} got no output; they stay pending for the next run.", color=BOLD_BRIGHT_RED, file=filepath, count=PROGRESS.errors)
+    if SHUTDOWN.requested:
+        EVENTS.warning("file_interrupted", "⏹️ Stopped {file} after {reason}; finished outputs are saved.", color=BOLD_BRIGHT_YELLOW, file=filepath, reason=SHUTDOWN.reason)
+    elif not PROGRESS.errors:
+        EVENTS.info("file_done", "🎉 All items in {file} processed successfully!\n", color=BOLD_BRIGHT_GREEN, file=filepath, total=total)
+    if PROFILER.enabled:
+        stages = PROFILER.summary()
+        EVENTS.info("stage_timings", "⏱️ Stage timings for {file}:\n{table}", file=filepath, table=PROFILER.format_summary(stages), stages=stages)
+    return data.pending_count()
 
+def _process_batches(filepath, data, model_provider, batch_size, journal, shared_executor=None):
     total = len(data)
     for i in range(0, total, batch_size):
-        batch = data[i:i + batch_size]
+        # Stop dispatching new items once shutdown was requested
+        if SHUTDOWN.requested:
+            break
+
+        # Only items with an empty output are sent; finished ones are left untouched
+        pending = data.pending(i, i + batch_size)
 
         # Skip batch if all already have output
-        if all("output" in item and item["output"] for item in batch):
+        if not pending:
             continue
 
-        print(f"{BOLD_BRIGHT_YELLOW}\n🔹 Processing items {i+1} to {min(i+batch_size, total)} / {total}{RESET}")
+        EVENTS.debug("batch_start", "\n🔹 Processing items {first} to {last} / {total}", color=BOLD_BRIGHT_YELLOW, first=i + 1, last=min(i + batch_size, total), total=total)
 
         # --- Run batch concurrently ---
-        with ThreadPoolExecutor(max_workers=batch_size) as executor:
-            # We pass model_provider to the worker function. 
-            # Note: Provider instances should be thread-safe (requests.Session is thread-safe).
-            futures = {executor.submit(generate_output, item, model_provider): idx for idx, item in enumerate(batch)}
-
-            # Collect results in the same order
-            results = [None] * len(batch)
-            for future in as_completed(futures):
-                idx = futures[future]
-                try:
-                    result = future.result()
-                    results[idx] = result
-                    if result:
-                        print(f"{BOLD_BRIGHT_GREEN}✅ Output generated for item {i+idx+1}{RESET}")
-                    else:
-                         print(f"{BOLD_BRIGHT_RED}❌ No output for item {i+idx+1}{RESET}")
-                except Exception as e:
-                    print(f"{BOLD_BRIGHT_RED}❌ Failed for item {i+idx+1}: {e}{RESET}")
-                    results[idx] = None
-
-        # --- Save results to data safely in order ---
         saved_count = 0
-        for j, output in enumerate(results):
-            if output:
-                data[i + j]["output"] = output
-                saved_count += 1
-        
-        if saved_count > 0:
-            save_data(filepath, data)
-            print(f"{BOLD_BRIGHT_CYAN}💾 Progress saved after batch {i//batch_size + 1}.{RESET}")
+        executor = shared_executor or ThreadPoolExecutor(max_workers=len(pending))
+        try:
+            with span("batch", start=i):
+                # We pass model_provider to the worker function. 
+                # Note: Provider instances should be thread-safe (requests.Session is thread-safe).
+                futures = {executor.submit(generate_output, data.item(idx), model_provider): idx for idx in pending}
+                PROGRESS.submitted(len(futures))
+
+                # Commit each output as soon as it arrives; poll so a shutdown deadline is honoured
+                not_done = set(futures)
+                while not_done:
+                    done, not_done = wait(not_done, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        idx = futures[future]
+                        try:
+                            result = future.result()
+                            if result:
+                                EVENTS.debug("item_done", "✅ Output generated for item {item}", color=BOLD_BRIGHT_GREEN, item=idx + 1)
+                            else:
+                                EVENTS.debug("item_failed", "❌ No output for item {item}", color=BOLD_BRIGHT_RED, item=idx + 1)
+                        except Exception as e:
+                            EVENTS.debug("item_error", "❌ Failed for item {item}: {error}", color=BOLD_BRIGHT_RED, item=idx + 1, error=e)
+                            result = None
+                        if result:
+                            journal.append(data, idx, result)
+                            data.set_output(idx, result)
+                            saved_count += 1
+                        PROGRESS.finished(bool(result))
+
+                    if not_done and SHUTDOWN.requested and SHUTDOWN.remaining() == 0:
+                        EVENTS.warning("drain_timeout", "⏹️ Abandoning {count} in-flight request(s) after the shutdown deadline.", color=BOLD_BRIGHT_YELLOW, count=len(not_done))
+                        for future in not_done:
+                            future.cancel()
+                            PROGRESS.finished(False)
+                        break
+        finally:
+            # Don't block on abandoned requests; they can no longer be committed
+            if executor is not shared_executor:
+                executor.shutdown(wait=False)
+
+            if saved_count > 0:
+                with span("save_data"):
+                    save_data(filepath, data)
+                journal.clear()
+                EVENTS.debug("saved", "💾 Progress saved after batch {batch}.", batch=i // batch_size + 1, saved=saved_count)
 
         # Small delay between batches
-        time.sleep(2)
+        with span("batch_sleep"):
+            SHUTDOWN.wait(2)
+
+# --- Watch Mode ---
+def watch(dataset_dir, model_provider, batch_size, executor, settle=2.0, force_polling=False, retry_delay=30.0):
+    """
+    Runs until shutdown, feeding new or changed dataset files to the shared
+    provider and worker pool once they are fully written.
+    """
+    watcher = DirectoryWatcher(dataset_dir, settle=settle, force_polling=force_polling, retry_delay=retry_delay)
+    EVENTS.info("watch_start", "👀 Watching {dir} for dataset files ({backend})...", color=BOLD_BRIGHT_MAGENTA, dir=dataset_dir, backend=watcher.backend.name)
+    try:
+        while not SHUTDOWN.requested:
+            for filepath in watcher.poll(timeout=1.0):
+                if SHUTDOWN.requested:
+                    break
+                pending = process_file(filepath, model_provider, batch_size=batch_size, executor=executor)
+                if pending is None:
+                    # Likely still being written (or broken); a bad parse is not "done"
+                    delay = watcher.retry_later(filepath)
+                    EVENTS.warning("watch_retry", "🔁 Could not load {file}; retrying in {delay:.0f}s or when it changes.", color=BOLD_BRIGHT_YELLOW, file=filepath, delay=delay)
+                elif pending and not SHUTDOWN.requested:
+                    delay = watcher.retry_later(filepath)
+                    EVENTS.warning("watch_retry", "🔁 {count} item(s) in {file} still pending; retrying in {delay:.0f}s.", color=BOLD_BRIGHT_YELLOW, file=filepath, count=pending, delay=delay)
+                elif not pending:
+                    watcher.mark_processed(filepath)
+    finally:
+        watcher.close()
 
-    print(f"{BOLD_BRIGHT_GREEN}🎉 All items in {filepath} processed successfully!\n{RESET}")
+# --- Dry Run ---
+def dry_run(dataset_dir):
+    """
+    Validates every dataset file and estimates the pending work.
+    Makes no network calls and leaves files, temp files and journals untouched.
+    """
+    files = items = pending = tokens = invalid = 0
+    for filename in sorted(os.listdir(dataset_dir)):
+        if not filename.endswith(".json"):
+            continue
+        filepath = os.path.join(dataset_dir, filename)
+        files += 1
+        try:
+            data = ItemStore.load(filepath)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError) as e:
+            # Unreadable paths (directories named *.json, permission errors) count as invalid too
+            invalid += 1
+            EVENTS.error("dry_run_invalid", "❌ {file}: invalid dataset ({error})", file=filepath, error=e)
+            continue
+
+        file_pending = file_tokens = missing = 0
+        for idx in range(len(data)):
+            if data.has_output(idx):
+                continue
+            item = data.item(idx)
+            file_pending += 1
+            if not item.get("instruction"):
+                missing += 1
+            file_tokens += estimate_tokens(build_prompt(item) or "")
+
+        notes = []
+        if missing:
+            notes.append(f"{missing} without instruction")
+        if os.path.exists(filepath + ".journal"):
+            notes.append("journal pending replay")
+        EVENTS.info(
+            "dry_run_file", "📄 {file}: {items} items, {pending} pending, ~{tokens} prompt tokens{notes}",
+            color=BOLD_BRIGHT_CYAN, file=filepath, items=len(data), pending=file_pending, tokens=file_tokens,
+            missing_instruction=missing, notes=f" ({', '.join(notes)})" if notes else "",
+        )
+        items += len(data)
+        pending += file_pending
+        tokens += file_tokens
+
+    EVENTS.info(
+        "dry_run_total", "🧮 {files} file(s), {invalid} invalid, {items} items, {pending} pending, ~{tokens} prompt tokens",
+        color=BOLD_BRIGHT_GREEN, files=files, invalid=invalid, items=items, pending=pending, tokens=tokens,
+    )
+    return invalid == 0
 
 # --- Run ---
 if __name__=="__main__":
     parser = argparse.ArgumentParser(description="LLM Finetuning Dataset Generator")
-    parser.add_argument("--provider", type=str, default="nvidia", choices=PROVIDERS.keys(), help="The LLM provider to use.")
+    parser.add_argument("--provider", type=str, default="nvidia", choices=PROVIDER_NAMES, help="The LLM provider to use.")
     parser.add_argument("--batch-size", type=int, default=3, help="Batch size for concurrent requests.")
     parser.add_argument("--dataset-dir", type=str, default=DATASET_FILES_DIR, help="Directory containing dataset JSON files.")
+    parser.add_argument("--profile", type=str, default=None, metavar="TRACE_FILE", help="Record per-stage timings and write a trace (Chrome trace JSON, or collapsed stacks for .folded/.txt).")
+    parser.add_argument("--cascade", type=str, default=None, metavar="SPEC", help="Cascade tiers as 'provider[:model],...', cheapest first. Overrides --provider.")
+    parser.add_argument("--cascade-min-chars", type=int, default=0, help="Escalate answers shorter than this many characters.")
+    parser.add_argument("--cascade-min-confidence", type=float, default=None, help="Ask lower tiers for a self-reported confidence and escalate below this value (0-1).")
+    parser.add_argument("--cascade-validator", action="append", default=[], choices=VALIDATORS.keys(), help="Validator an answer must pass to avoid escalation. Repeatable.")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0, help="Seconds to let in-flight requests finish after SIGINT/SIGTERM.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and process new or changed dataset files as they appear.")
+    parser.add_argument("--watch-settle", type=float, default=2.0, help="Seconds a file must stay unchanged before it is picked up in watch mode.")
+    parser.add_argument("--watch-retry", type=float, default=30.0, help="Initial backoff in seconds before watch mode retries a file it could not finish (doubles up to 15 minutes).")
+    parser.add_argument("--watch-poll", action="store_true", help="Poll the directory instead of using inotify in watch mode.")
+    parser.add_argument("--dry-run", action="store_true", help="Validate datasets, count pending items and estimate tokens without any network calls.")
+    parser.add_argument("--log-level", type=str, default="info", choices=LEVELS.keys(), help="Verbosity. Per-item messages are only built at 'debug'.")
+    parser.add_argument("--log-file", type=str, default=None, help="Append structured JSON-lines events to this file.")
+    parser.add_argument("--console-level", type=str, default=None, choices=LEVELS.keys(), help="Console verbosity. Defaults to --log-level, or to 'info' when --log-file is set.")
     
     args = parser.parse_args()
+    EVENTS.configure(level=args.log_level, path=args.log_file, console_level=args.console_level)
+
+    if args.profile:
+        PROFILER.enable()
+
+    if not os.path.exists(args.dataset_dir):
+         print(f"{BOLD_BRIGHT_RED}Dataset directory {args.dataset_dir} does not exist.{RESET}")
+         exit(1)
+
+    if args.dry_run:
+        ok = dry_run(args.dataset_dir)
+        EVENTS.close()
+        exit(0 if ok else 1)
     
-    provider_class = PROVIDERS[args.provider.lower()]
+    provider_label = args.cascade or args.provider
     
     try:
         # Instantiate provider. API keys are loaded internally from Config/env
-        model_provider = provider_class() 
-        print(f"{BOLD_BRIGHT_GREEN}Initialized {args.provider} provider.{RESET}")
+        if args.cascade:
+            model_provider = build_cascade(
+                args.cascade,
+                min_chars=args.cascade_min_chars,
+                min_confidence=args.cascade_min_confidence,
+                validators=args.cascade_validator,
+            )
+            print(f"{BOLD_BRIGHT_GREEN}Initialized cascade: {' -> '.join(label for label, _ in model_provider.tiers)}.{RESET}")
+        else:
+            model_provider = get_provider(args.provider)()
+            print(f"{BOLD_BRIGHT_GREEN}Initialized {args.provider} provider.{RESET}")
     except Exception as e:
-        print(f"{BOLD_BRIGHT_RED}Failed to initialize provider {args.provider}: {e}{RESET}")
+        print(f"{BOLD_BRIGHT_RED}Failed to initialize provider {provider_label}: {e}{RESET}")
         print(f"{BOLD_BRIGHT_YELLOW}Please ensure you have set the API Key in environment variables or Config/config.py{RESET}")
         exit(1)
 
-    if not os.path.exists(args.dataset_dir):
-         print(f"{BOLD_BRIGHT_RED}Dataset directory {args.dataset_dir} does not exist.{RESET}")
-         exit(1)
+    SHUTDOWN.drain_timeout = args.shutdown_timeout
+    SHUTDOWN.install()
+
+    # One worker pool for the whole run, so threads and pooled connections stay warm between files
+    executor = ThreadPoolExecutor(max_workers=args.batch_size)
+
+    try:
+        if args.watch:
+            watch(args.dataset_dir, model_provider, args.batch_size, executor, settle=args.watch_settle, force_polling=args.watch_poll, retry_delay=args.watch_retry)
+        else:
+            for filepath in os.listdir(args.dataset_dir):
+                if SHUTDOWN.requested:
+                    break
+                if filepath.endswith(".json"):
+                    full_filepath = os.path.join(args.dataset_dir, filepath)
+                    process_file(full_filepath, model_provider, batch_size=args.batch_size, executor=executor)
+    except KeyboardInterrupt:
+        # Second signal: outputs already journaled are recovered on the next run
+        EVENTS.warning("aborted", "⏹️ Aborted. Finished outputs are journaled and will be committed on the next run.", color=BOLD_BRIGHT_RED)
+        SHUTDOWN.request("SIGINT")
+
+    if isinstance(model_provider, Cascade):
+        tiers = model_provider.stats()
+        EVENTS.info("cascade_stats", "📊 Cascade tiers:\n{table}", color=BOLD_BRIGHT_CYAN, table=model_provider.format_stats(tiers), tiers=tiers)
+
+    if args.profile:
+        PROFILER.write_trace(args.profile)
+        print(f"{BOLD_BRIGHT_CYAN}Profile trace written to {args.profile}{RESET}")
+
+    executor.shutdown(wait=not SHUTDOWN.requested)
 
-    for filepath in os.listdir(args.dataset_dir):
-        if filepath.endswith(".json"):
-            full_filepath = os.path.join(args.dataset_dir, filepath)
-            process_file(full_filepath, model_provider, batch_size=args.batch_size)
+    if SHUTDOWN.requested:
+        # Skip joining worker threads still blocked on abandoned HTTP calls
+        EVENTS.close()
+        os._exit(SHUTDOWN.exit_code)